@@ -1,12 +1,16 @@
 import streamlit as st
+import hashlib
+import html
 import os
 from pathlib import Path
+from typing import Callable, Optional
 
 # Import custom modules
 from core.document_processor import DocumentProcessor
 from core.ai_assistant import AIAssistant
 from core.question_generator import QuestionGenerator
-from utils.validators import validate_question
+from utils.text_utils import content_hash, extract_key_sentences
+from utils.validators import validate_answer, validate_question
 from config.settings import settings
 
 # Page configuration
@@ -18,11 +22,15 @@ st.set_page_config(
 )
 
 # Load custom CSS
+@st.cache_data
+def _read_css(path: str = "static/style.css") -> str:
+    css_file = Path(path)
+    return css_file.read_text() if css_file.exists() else ""
+
 def load_css():
-    css_file = Path("static/style.css")
-    if css_file.exists():
-        with open(css_file) as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    css = _read_css()
+    if css:
+        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
 
 load_css()
 
@@ -44,19 +52,96 @@ def initialize_session_state():
         st.session_state.user_answers = {}
     if 'evaluations' not in st.session_state:
         st.session_state.evaluations = {}
+    if 'regenerate_challenge' not in st.session_state:
+        st.session_state.regenerate_challenge = False
 
 initialize_session_state()
 
-# Initialize processors
+# Initialize processors (created once per process and shared across sessions)
+@st.cache_resource
+def _doc_processor() -> DocumentProcessor:
+    return DocumentProcessor()
+
+@st.cache_resource
+def _ai_assistant() -> AIAssistant:
+    return AIAssistant()
+
 @st.cache_resource
-def get_processors():
-    return {
-        'doc_processor': DocumentProcessor(),
-        'ai_assistant': AIAssistant(),
-        'question_generator': QuestionGenerator()
-    }
+def _question_generator() -> QuestionGenerator:
+    return QuestionGenerator()
+
+class _Uncached(Exception):
+    """Carries a failed result out of a cached helper so Streamlit won't store it."""
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+def _file_hash(uploaded_file) -> str:
+    # Hash in 64 KiB reads rather than copying the whole upload with getvalue()
+    file_hash = hashlib.blake2b(digest_size=16)
+    position = uploaded_file.tell()
+    uploaded_file.seek(0)
+    for block in iter(lambda: uploaded_file.read(65536), b''):
+        file_hash.update(block)
+    uploaded_file.seek(position)
+    return file_hash.hexdigest()
+
+# Extracted text is kept in memory only, so documents never land in the disk cache
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_process_file(file_name: str, file_hash: str, _uploaded_file) -> tuple:
+    return _doc_processor().process_file(_uploaded_file)
 
-processors = get_processors()
+# Cached Gemini calls, keyed on the document hash. The text itself is passed with a
+# leading underscore so Streamlit skips hashing it.
+@st.cache_resource(max_entries=8)
+def _key_sentences(text_sha: str, _text: str) -> list:
+    return extract_key_sentences(_text, settings.MAX_KEY_SENTENCES)
+
+@st.cache_data(show_spinner=False, max_entries=32, persist="disk")
+def _cached_summary(text_sha: str, _text: str) -> str:
+    summary = _ai_assistant().generate_summary(_text, _key_sentences(text_sha, _text))
+    if summary.startswith("Error generating summary"):
+        raise _Uncached(summary)
+    return summary
+
+class _CacheMiss(Exception):
+    """Raised by the store-after helper below when nothing is cached for a key yet."""
+
+# Answers are computed outside this cached function so they can be streamed to the
+# page; a fresh result is stored by calling again with the result. Challenge questions
+# are cached by QuestionGenerator's ResponseCache only.
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=256)
+def _cached_answer(doc_hash: str, question_key: str, _answer_data: Optional[dict] = None) -> dict:
+    if _answer_data is None:
+        raise _CacheMiss
+    return _answer_data
+
+def get_summary(text: str) -> str:
+    try:
+        return _cached_summary(content_hash(text), text)
+    except _Uncached as e:
+        return e.value
+
+def get_challenge_questions(text: str, on_question: Optional[Callable[[list], None]] = None,
+                            regenerate: bool = False) -> list:
+    questions = []
+    for question in _question_generator().stream_challenge_questions(text, regenerate):
+        questions.append(question)
+        if on_question:
+            on_question(questions)
+    return questions
+
+def get_answer(question: str, document_text: str, on_text: Optional[Callable[[str], None]] = None) -> dict:
+    doc_hash, question_key = content_hash(document_text), question.strip().lower()
+    try:
+        return _cached_answer(doc_hash, question_key)
+    except _CacheMiss:
+        pass
+    
+    answer_data = _ai_assistant().answer_question(question, document_text, on_text=on_text)
+    if answer_data.get('confidence') != 0:
+        _cached_answer(doc_hash, question_key, answer_data)
+    return answer_data
 
 def main():
     st.markdown("<h1 class='main-header'>📚 Smart Document Assistant</h1>", unsafe_allow_html=True)
@@ -109,14 +194,18 @@ def show_upload_interface():
 
 def process_uploaded_file(uploaded_file):
     with st.spinner("Processing document..."):
-        success, text, error = processors['doc_processor'].process_file(uploaded_file)
+        success, text, error = _cached_process_file(
+            uploaded_file.name, _file_hash(uploaded_file), uploaded_file
+        )
         
         if success:
             st.session_state.document_text = text
             st.session_state.document_name = uploaded_file.name
+            _ai_assistant().load_document(text)
+            _question_generator().load_document(text)
             
             # Generate summary
-            summary = processors['ai_assistant'].generate_summary(text)
+            summary = get_summary(text)
             st.session_state.summary = summary
             
             st.success("✅ Document processed successfully!")
@@ -125,11 +214,14 @@ def process_uploaded_file(uploaded_file):
             st.error(f"❌ Error: {error}")
 
 def show_document_interface():
-    # Display document summary
-    st.markdown("<div class='summary-box'>", unsafe_allow_html=True)
-    st.subheader("📋 Document Summary")
-    st.write(st.session_state.summary)
-    st.markdown("</div>", unsafe_allow_html=True)
+    # Display document summary as a single element so each rerun sends one delta. The
+    # blank lines end the HTML block so the summary's markdown still renders; escaping
+    # only <, > and & neutralises raw HTML without touching markdown syntax.
+    st.markdown(
+        "<div class='summary-box'>\n\n### 📋 Document Summary\n\n"
+        f"{html.escape(st.session_state.summary, quote=False)}\n\n</div>",
+        unsafe_allow_html=True
+    )
     
     # Mode selection
     mode = st.session_state.get('interaction_mode', 'Ask Anything')
@@ -143,30 +235,30 @@ def show_qa_interface():
     st.header("💬 Ask Anything")
     st.write("Ask any question about the document content.")
     
-    question = st.text_area(
-        "Your question:",
-        placeholder="What are the main findings of this document?",
-        height=100
-    )
-    
-    col1, col2 = st.columns([1, 4])
-    
-    with col1:
-        ask_button = st.button("🤔 Ask", type="primary")
+    # A form only reruns the script on submit, not on every edit of the question
+    with st.form("qa_form", clear_on_submit=False):
+        question = st.text_area(
+            "Your question:",
+            placeholder="What are the main findings of this document?",
+            height=100
+        )
+        ask_button = st.form_submit_button("🤔 Ask", type="primary")
     
-    with col2:
-        if st.button("🗑️ Clear History"):
-            processors['ai_assistant'].clear_history()
-            st.success("Conversation history cleared!")
+    if st.button("🗑️ Clear History"):
+        _ai_assistant().clear_history()
+        st.success("Conversation history cleared!")
     
     if ask_button and question:
         is_valid, error_msg = validate_question(question)
         
         if is_valid:
             with st.spinner("Thinking..."):
-                answer_data = processors['ai_assistant'].answer_question(
-                    question, st.session_state.document_text
+                # Show the response as it streams in, then replace it with the formatted answer
+                stream_placeholder = st.empty()
+                answer_data = get_answer(
+                    question, st.session_state.document_text, on_text=stream_placeholder.markdown
                 )
+                stream_placeholder.empty()
                 
                 st.markdown("<div class='question-box'>", unsafe_allow_html=True)
                 st.write(f"**Question:** {question}")
@@ -188,14 +280,21 @@ def show_challenge_interface():
     if not st.session_state.challenge_questions:
         if st.button("🎲 Generate Challenge Questions", type="primary"):
             with st.spinner("Generating challenging questions..."):
-                questions = processors['question_generator'].generate_challenge_questions(
-                    st.session_state.document_text
+                progress = st.empty()
+                questions = get_challenge_questions(
+                    st.session_state.document_text,
+                    on_question=lambda ready: progress.caption(f"✅ {len(ready)} of 3 questions ready..."),
+                    regenerate=st.session_state.regenerate_challenge
                 )
                 st.session_state.challenge_questions = questions
+                st.session_state.regenerate_challenge = False
                 st.rerun()
     else:
         show_challenge_questions()
 
+# Runs as a fragment so submitting an answer or moving to the next question only
+# reruns this block, not the summary, sidebar and CSS injection around it
+@st.fragment
 def show_challenge_questions():
     questions = st.session_state.challenge_questions
     current_idx = st.session_state.current_question_index
@@ -213,27 +312,25 @@ def show_challenge_questions():
         st.markdown("</div>", unsafe_allow_html=True)
         
         # Answer input
-        user_answer = st.text_area(
-            "Your answer:",
-            key=f"answer_{current_idx}",
-            height=100,
-            placeholder="Type your answer here..."
-        )
-        
-        col1, col2, col3 = st.columns([1, 1, 2])
+        with st.form(f"answer_form_{current_idx}", clear_on_submit=False):
+            user_answer = st.text_area(
+                "Your answer:",
+                key=f"answer_{current_idx}",
+                height=100,
+                placeholder="Type your answer here..."
+            )
+            submitted = st.form_submit_button("✅ Submit Answer", type="primary")
         
-        with col1:
-            if st.button("✅ Submit Answer", type="primary"):
-                if user_answer.strip():
-                    evaluate_answer(current_idx, user_answer, question_data)
-                else:
-                    st.error("Please provide an answer before submitting.")
+        if submitted:
+            if user_answer.strip():
+                evaluate_answer(current_idx, user_answer, question_data)
+            else:
+                st.error("Please provide an answer before submitting.")
         
-        with col2:
-            if current_idx < len(questions) - 1:
-                if st.button("➡️ Next Question"):
-                    st.session_state.current_question_index += 1
-                    st.rerun()
+        if current_idx < len(questions) - 1:
+            if st.button("➡️ Next Question"):
+                st.session_state.current_question_index += 1
+                st.rerun(scope="fragment")
         
         # Show evaluation if available
         if current_idx in st.session_state.evaluations:
@@ -243,8 +340,19 @@ def show_challenge_questions():
         show_challenge_results()
 
 def evaluate_answer(question_idx, user_answer, question_data):
+    # Obvious non-answers get the lowest score without spending an API call
+    is_valid, error_msg = validate_answer(user_answer)
+    if not is_valid:
+        st.session_state.evaluations[question_idx] = {
+            "score": 1,
+            "feedback": error_msg,
+            "justification": "The answer was too short to compare against the document."
+        }
+        st.session_state.user_answers[question_idx] = user_answer
+        st.rerun(scope="fragment")
+    
     with st.spinner("Evaluating your answer..."):
-        evaluation = processors['question_generator'].evaluate_answer(
+        evaluation = _question_generator().evaluate_answer(
             question_data['question'],
             user_answer,
             st.session_state.document_text,
@@ -253,7 +361,7 @@ def evaluate_answer(question_idx, user_answer, question_data):
         
         st.session_state.evaluations[question_idx] = evaluation
         st.session_state.user_answers[question_idx] = user_answer
-        st.rerun()
+        st.rerun(scope="fragment")
 
 def show_evaluation(question_idx):
     evaluation = st.session_state.evaluations[question_idx]
@@ -320,6 +428,8 @@ def show_challenge_results():
     with col1:
         if st.button("🔄 Try New Challenge"):
             st.session_state.challenge_questions = []
+            # Ask for a fresh set instead of the cached one for this document
+            st.session_state.regenerate_challenge = True
             st.session_state.current_question_index = 0
             st.session_state.user_answers = {}
             st.session_state.evaluations = {}
@@ -334,7 +444,8 @@ def reset_session():
     """Reset all session state variables."""
     keys_to_reset = [
         'document_text', 'document_name', 'summary', 'current_mode',
-        'challenge_questions', 'current_question_index', 'user_answers', 'evaluations'
+        'challenge_questions', 'current_question_index', 'user_answers', 'evaluations',
+        'regenerate_challenge'
     ]
     
     for key in keys_to_reset:
@@ -342,7 +453,7 @@ def reset_session():
             del st.session_state[key]
     
     # Clear AI assistant history
-    processors['ai_assistant'].clear_history()
+    _ai_assistant().clear_history()
 
 # Footer
 def show_footer():
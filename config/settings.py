@@ -9,21 +9,43 @@ class Settings:
     
     # Model Configuration
     GEMINI_MODEL = "gemini-1.5-flash"  # Free tier model
+    GEMINI_BATCH_MODEL = "gemini-2.5-flash"  # Batch API supports Gemini 2.x models
     
     # Generation Parameters
     MAX_TOKENS = 1000
     TEMPERATURE = 0.3
+    # Service tiers ("flex", "standard" or "priority") for interactive calls and for
+    # background grading. Tiered calls are sent through the google-genai client; unset
+    # uses the standard tier.
+    GEMINI_SERVICE_TIER_INTERACTIVE = os.getenv("GEMINI_SERVICE_TIER_INTERACTIVE")
+    GEMINI_SERVICE_TIER_BATCH = os.getenv("GEMINI_SERVICE_TIER_BATCH")
+    GEMINI_MAX_CONCURRENCY = 4  # Parallel requests per batch, kept low for free-tier RPM
     
     # File Configuration
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS = ['.pdf', '.txt']
-    SUPPORTED_FORMATS = ['.pdf', '.txt']  # Added for validators.py
+    SUPPORTED_FORMATS = frozenset({'.pdf', '.txt'})  # Added for validators.py
+    SUPPORTED_FORMATS_DISPLAY = ", ".join(sorted(SUPPORTED_FORMATS))
     UPLOAD_FOLDER = 'uploads'
     
     # Processing Configuration
     CHUNK_SIZE = 1500
     CHUNK_OVERLAP = 150
     MAX_KEY_SENTENCES = 8
+    QUESTION_PROMPT_TOKENS = 500  # Document excerpt budget for question generation
+    EVALUATION_PROMPT_TOKENS = 250  # Document excerpt budget for answer evaluation
+    
+    # Context Caching (large documents only; requires an explicitly versioned model)
+    CONTEXT_CACHE_MODEL = "gemini-1.5-flash-001"
+    CONTEXT_CACHE_MIN_CHARS = 32768 * 4  # ~32k tokens, Gemini's minimum cache size
+    CONTEXT_CACHE_TTL = 3600  # seconds
+    CONTEXT_CACHE_MAX_DOCUMENTS = 4  # Handles kept alive at once; evicted ones are deleted
+    
+    # Response Cache
+    RESPONSE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".sda", "cache.db")
+    SEMANTIC_CACHE_ENABLED = False  # Reuse evaluations of near-duplicate answers
+    SEMANTIC_CACHE_THRESHOLD = 0.92  # Minimum cosine similarity for a semantic hit
+    EMBEDDING_MODEL = "models/gemini-embedding-001"
     
     # UI Configuration
     PAGE_TITLE = "Smart Document Assistant"
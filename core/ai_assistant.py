@@ -1,11 +1,28 @@
 import os
-import google.generativeai as genai
+import re
+from collections import deque
+from functools import lru_cache
+# pyright: reportPrivateImportUsage=false
 from google.generativeai.types import GenerationConfig
-from typing import Dict, Optional, Any
+from typing import Callable, Dict, FrozenSet, List, Optional, Any, Tuple
 from config.settings import settings
+from core.context_cache import document_context_cache
+from core.genai_client import configure_genai, shared_model
 from utils.text_utils import chunk_text, extract_key_sentences
-# pyright: reportPrivateImportUsage=false
-import google.generativeai as genai
+
+
+_ANSWER_RE = re.compile(r'^(Answer|Reference):[ \t]*(.*)$', re.MULTILINE)
+
+# Generation configs are immutable, so one instance per call type is shared
+_SUMMARY_CFG = GenerationConfig(max_output_tokens=200, temperature=0.3)
+_QA_CFG = GenerationConfig(max_output_tokens=settings.MAX_TOKENS, temperature=settings.TEMPERATURE)
+
+
+@lru_cache(maxsize=8)
+def _chunk_index(document_text: str) -> Tuple[Tuple[str, ...], Tuple[FrozenSet[str], ...]]:
+    """Chunk a document and tokenize each chunk once, so repeat questions reuse the work."""
+    chunks = tuple(chunk_text(document_text, settings.CHUNK_SIZE, settings.CHUNK_OVERLAP))
+    return chunks, tuple(frozenset(chunk.lower().split()) for chunk in chunks)
 
 
 class AIAssistant:
@@ -14,20 +31,32 @@ class AIAssistant:
         if not self.api_key:
             raise ValueError("Gemini API key not found")
         
-        self.conversation_history = []
+        # Bounded: this object is shared by every session via st.cache_resource
+        self.conversation_history: deque = deque(maxlen=32)
+        self.context_cache = document_context_cache
         self._initialize_model()
     
     def _initialize_model(self):
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        configure_genai(self.api_key)
+    
+    @property
+    def model(self) -> Any:
+        # Looked up per call so a key change from any caller is picked up
+        return shared_model(settings.GEMINI_MODEL)
     
     def update_api_key(self, new_api_key: str):
         self.api_key = new_api_key
         self._initialize_model()
     
-    def generate_summary(self, document_text: str) -> str:
+    def load_document(self, document_text: str):
+        """Index a newly uploaded document and context-cache it if it is large enough."""
+        _chunk_index(document_text)
+        self.context_cache.load(document_text)
+    
+    def generate_summary(self, document_text: str, key_sentences: Optional[List[str]] = None) -> str:
         try:
-            key_sentences = extract_key_sentences(document_text, 8)
+            if key_sentences is None:
+                key_sentences = extract_key_sentences(document_text, settings.MAX_KEY_SENTENCES)
             key_content = ' '.join(key_sentences)
             
             prompt = f"""
@@ -38,13 +67,9 @@ class AIAssistant:
             
             Document content: {key_content}
             """
-            generation_config = GenerationConfig(
-                max_output_tokens=200,
-                temperature=0.3,
-            )
             response = self.model.generate_content(
                 prompt,
-                generation_config=generation_config
+                generation_config=_SUMMARY_CFG
             )
             content = response.text or ""
             words = content.strip().split()
@@ -53,15 +78,26 @@ class AIAssistant:
         except Exception as e:
             return f"Error generating summary: {str(e)}"
     
-    def answer_question(self, question: str, document_text: str) -> Dict[str, Any]:
+    def answer_question(self, question: str, document_text: str,
+                        on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Answer a question about the document.
+
+        If ``on_text`` is given the response is streamed, and ``on_text`` is called
+        with the text received so far after each chunk.
+        """
         try:
-            chunks = chunk_text(document_text, 1500, 150)
-            best_chunk = self._find_relevant_chunk(question, chunks)
+            model = self.context_cache.model_for(document_text)
+            if model is not None:
+                document_content = "Document content: the document provided in the cached context"
+            else:
+                chunks, token_sets = _chunk_index(document_text)
+                best_chunk = self._find_relevant_chunk(question, chunks, token_sets)
+                model, document_content = self.model, f"Document content: {best_chunk}"
             
             prompt = f"""
             Based ONLY on the following document content, answer the user's question.
 
-            Document content: {best_chunk}
+            {document_content}
 
             Question: {question}
 
@@ -75,15 +111,20 @@ class AIAssistant:
             Answer: [Your answer]
             Reference: [Specific location in document that supports this answer]
             """
-            generation_config = GenerationConfig(
-                max_output_tokens=settings.MAX_TOKENS,
-                temperature=settings.TEMPERATURE,
-            )
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config
-            )
-            parsed = self._parse_answer(response.text or "")
+            if on_text is None:
+                response = model.generate_content(
+                    prompt,
+                    generation_config=_QA_CFG
+                )
+                answer_text = response.text or ""
+            else:
+                parts: List[str] = []
+                for chunk in model.generate_content(prompt, generation_config=_QA_CFG, stream=True):
+                    if chunk.parts:
+                        parts.append(chunk.text)
+                        on_text("".join(parts))
+                answer_text = "".join(parts)
+            parsed = self._parse_answer(answer_text)
             self.conversation_history.append({
                 "question": question,
                 "answer": parsed["answer"],
@@ -98,22 +139,16 @@ class AIAssistant:
                 "confidence": 0
             }
 
-    def _find_relevant_chunk(self, question: str, chunks: list) -> str:
-        question_words = set(question.lower().split())
-        best_chunk, best_score = chunks[0], 0
-        for chunk in chunks:
-            overlap = len(question_words.intersection(set(chunk.lower().split())))
-            if overlap > best_score:
-                best_score, best_chunk = overlap, chunk
-        return best_chunk
+    def _find_relevant_chunk(self, question: str, chunks: Tuple[str, ...],
+                             token_sets: Tuple[FrozenSet[str], ...]) -> str:
+        question_words = frozenset(question.lower().split())
+        scores = [len(question_words & tokens) for tokens in token_sets]
+        return chunks[max(range(len(chunks)), key=scores.__getitem__)]
 
     def _parse_answer(self, answer_text: str) -> Dict[str, Any]:
         result = {"answer": "", "reference": "", "confidence": 0.8}
-        for line in answer_text.splitlines():
-            if line.startswith("Answer:"):
-                result["answer"] = line.split(":", 1)[1].strip()
-            elif line.startswith("Reference:"):
-                result["reference"] = line.split(":", 1)[1].strip()
+        for match in _ANSWER_RE.finditer(answer_text):
+            result[match.group(1).lower()] = match.group(2).strip()
         if not result["answer"]:
             result["answer"] = answer_text.strip()
             result["reference"] = "General document content"
@@ -121,12 +156,12 @@ class AIAssistant:
 
     def get_conversation_context(self) -> str:
         context = "Recent conversation:\n"
-        for item in self.conversation_history[-3:]:
+        for item in list(self.conversation_history)[-3:]:
             context += f"Q: {item['question']}\nA: {item['answer']}\n\n"
         return context if self.conversation_history else ""
 
     def clear_history(self):
-        self.conversation_history = []
+        self.conversation_history.clear()
 
     def validate_api_key(self) -> bool:
         try:
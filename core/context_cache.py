@@ -0,0 +1,114 @@
+"""
+Gemini context caching for large documents.
+"""
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional
+from config.settings import settings
+from utils.text_utils import content_hash
+
+# Optional so importers can report a missing SDK themselves; without it nothing is cached
+try:
+    # pyright: reportPrivateImportUsage=false
+    import google.generativeai as genai  # type: ignore[import]
+    from google.generativeai import caching  # type: ignore[import]
+except ImportError:
+    genai = None
+    caching = None
+
+
+class _CacheEntry(NamedTuple):
+    cached_content: Any
+    model: Any
+    expires_at: float
+
+
+class DocumentContextCache:
+    """Keep recently loaded large documents in Gemini's context cache.
+    
+    One instance is shared by every session, so handles are keyed by document hash
+    and all access goes through a lock. Evicted handles are deleted server-side.
+    """
+    
+    def __init__(self, max_documents: Optional[int] = None):
+        self.max_documents = max_documents or settings.CONTEXT_CACHE_MAX_DOCUMENTS
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def load(self, document_text: str):
+        """Upload the document as cached content if it is large enough to qualify."""
+        if caching is None or len(document_text) < settings.CONTEXT_CACHE_MIN_CHARS:
+            return
+        
+        doc_hash = content_hash(document_text)
+        with self._lock:
+            if self._live_entry(doc_hash) is not None:
+                return
+        
+        # Uploading can take a while, so don't hold the lock for it
+        try:
+            cached_content = caching.CachedContent.create(  # type: ignore[union-attr]
+                model=settings.CONTEXT_CACHE_MODEL,
+                contents=[document_text],
+                ttl=datetime.timedelta(seconds=settings.CONTEXT_CACHE_TTL)
+            )
+        except Exception as e:
+            # Caching is a paid-tier feature; fall back to sending chunks per request
+            print(f"Context caching unavailable: {e}")  # For debugging
+            return
+        
+        stale: List[Any] = []
+        with self._lock:
+            if self._live_entry(doc_hash) is not None:
+                # Another session cached the same document meanwhile; keep theirs
+                stale.append(cached_content)
+            else:
+                old = self._entries.pop(doc_hash, None)
+                if old is not None:
+                    stale.append(old.cached_content)
+                self._entries[doc_hash] = _CacheEntry(
+                    cached_content,
+                    genai.GenerativeModel.from_cached_content(cached_content=cached_content),  # type: ignore[union-attr]
+                    # Stop using the handle a minute before the server expires it
+                    time.monotonic() + settings.CONTEXT_CACHE_TTL - 60
+                )
+                while len(self._entries) > self.max_documents:
+                    stale.append(self._entries.popitem(last=False)[1].cached_content)
+        self._delete(stale)
+    
+    def model_for(self, document_text: str) -> Any:
+        """Return a model bound to the cached document, or None if it isn't cached."""
+        if len(document_text) < settings.CONTEXT_CACHE_MIN_CHARS:
+            return None
+        with self._lock:
+            entry = self._live_entry(content_hash(document_text))
+            return entry.model if entry is not None else None
+    
+    def clear(self):
+        """Delete all cached content."""
+        with self._lock:
+            stale = [entry.cached_content for entry in self._entries.values()]
+            self._entries.clear()
+        self._delete(stale)
+    
+    def _live_entry(self, doc_hash: str) -> Optional[_CacheEntry]:
+        """Unexpired entry for a document, marked most recently used. Call with the lock held."""
+        entry = self._entries.get(doc_hash)
+        if entry is None or time.monotonic() >= entry.expires_at:
+            return None
+        self._entries.move_to_end(doc_hash)
+        return entry
+    
+    @staticmethod
+    def _delete(cached_contents: List[Any]):
+        for cached_content in cached_contents:
+            try:
+                cached_content.delete()
+            except Exception as e:
+                print(f"Failed to delete cached content: {e}")  # For debugging
+
+
+# Shared by AIAssistant and QuestionGenerator so each document is only cached once
+document_context_cache = DocumentContextCache()
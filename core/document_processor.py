@@ -1,8 +1,7 @@
-import os
-import PyPDF2
+import pypdf
 from typing import Optional, Tuple
 from utils.text_utils import clean_text
-from utils.validators import validate_file
+from utils.validators import get_file_extension, validate_file
 
 class DocumentProcessor:
     def __init__(self):
@@ -16,7 +15,7 @@ class DocumentProcessor:
             return False, "", error_msg
         
         try:
-            file_extension = os.path.splitext(uploaded_file.name)[1].lower()
+            file_extension = get_file_extension(uploaded_file.name)
             
             if file_extension == '.pdf':
                 text = self._extract_pdf_text(uploaded_file)
@@ -36,15 +35,11 @@ class DocumentProcessor:
     
     def _extract_pdf_text(self, file) -> str:
         """Extract text from PDF file."""
-        text = ""
-        pdf_reader = PyPDF2.PdfReader(file)
-        
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        
-        return text
+        pdf_reader = pypdf.PdfReader(file)
+        return "\n".join(
+            page_text for page_text in (page.extract_text() for page in pdf_reader.pages)
+            if page_text
+        )
     
     def _extract_txt_text(self, file) -> str:
         """Extract text from TXT file."""
@@ -0,0 +1,50 @@
+"""
+Process-wide google.generativeai configuration shared by every Gemini caller.
+"""
+import threading
+from functools import lru_cache
+from typing import Any, Optional
+from config.settings import settings
+
+# Optional so importers can report a missing SDK themselves (see QuestionGenerator)
+try:
+    # pyright: reportPrivateImportUsage=false
+    import google.generativeai as genai  # type: ignore[import]
+except ImportError:
+    genai = None
+
+_lock = threading.Lock()
+
+# API key genai is currently configured with, so unchanged keys skip reconfiguring
+_configured_key: Optional[str] = None
+
+
+def configure_genai(api_key: Optional[str] = None):
+    """Switch genai to api_key, or with no key, configure from settings unless a key is already set.
+
+    genai's configuration is global, so switching keys applies to every caller; models
+    built under the previous key are dropped so shared_model hands out fresh ones.
+    """
+    global _configured_key
+    if genai is None:
+        raise ImportError("google.generativeai package is not installed. Please install it with: pip install google-generativeai")
+    with _lock:
+        if api_key is None:
+            if _configured_key is not None:
+                return
+            api_key = settings.GEMINI_API_KEY
+        if api_key != _configured_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+            _model.cache_clear()
+
+
+def shared_model(model_name: str) -> Any:
+    """Return the process-wide model for model_name under the configured key."""
+    with _lock:
+        return _model(model_name)
+
+
+@lru_cache(maxsize=4)
+def _model(model_name: str) -> Any:
+    return genai.GenerativeModel(model_name)  # type: ignore[union-attr]
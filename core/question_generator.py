@@ -1,9 +1,19 @@
 """
 QuestionGenerator class with proper imports and type handling.
 """
-import random
-from typing import List, Dict, Optional, Any, Union
+import asyncio
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Generator, Iterator, List, Dict, NamedTuple, Optional, Any, Sequence, Tuple, Union
 from config.settings import settings
+from core.context_cache import document_context_cache
+from core.genai_client import configure_genai, shared_model
+from utils.embedding import embed_batch
+from utils.response_cache import ResponseCache
+from utils.text_utils import content_hash, truncate_to_tokens
 
 # Import with proper error handling and type ignoring for Pylance
 try:
@@ -13,6 +23,134 @@ except ImportError:
     GENAI_AVAILABLE = False
     genai = None
 
+# The Batch API and service tiers are only exposed by the newer google-genai SDK
+try:
+    from google import genai as genai_sdk  # type: ignore[import]
+    GENAI_SDK_AVAILABLE = True
+except ImportError:
+    GENAI_SDK_AVAILABLE = False
+    genai_sdk = None
+
+# Dictionary approach works better with current package versions
+QUESTION_GENERATION_CONFIG: Any = {
+    'max_output_tokens': 800,
+    'temperature': 0.5,
+}
+
+# A "Q1: ..." line followed (after optional blank lines) by its "A1: ..." line
+_QA_RE = re.compile(
+    r'^[ \t]*Q(?:uestion)?[ \t]*\d*[ \t]*:[ \t]*(.+?)[ \t\r]*$\s*'
+    r'^[ \t]*A(?:nswer)?[ \t]*\d*[ \t]*:[ \t]*(.+?)[ \t\r]*$',
+    re.MULTILINE
+)
+
+EVALUATION_CONFIG: Any = {
+    'max_output_tokens': 400,
+    'temperature': 0.3,
+}
+
+# One line of an evaluation response; exactly one named group matches per line
+_EVAL_RE = re.compile(
+    r'^[ \t]*(?:Score:[ \t]*(?P<score>\d+)'
+    r'|Feedback:[ \t]*(?P<feedback>.*?)[ \t\r]*$'
+    r'|Justification:[ \t]*(?P<justification>.*?)[ \t\r]*$)',
+    re.MULTILINE
+)
+
+# Prompt templates, filled with %-substitution so user text is never parsed for fields
+_QUESTION_TMPL = """Based on %s, generate exactly 3 challenging questions that test comprehension, inference, and analysis.
+
+%s
+
+Create questions that:
+1. Require understanding of key concepts
+2. Test ability to make inferences
+3. Analyze relationships between ideas
+
+Format each question as:
+Q1: [Question]
+A1: [Expected answer based on document]
+
+Q2: [Question]
+A2: [Expected answer based on document]
+
+Q3: [Question]
+A3: [Expected answer based on document]
+"""
+
+_EVAL_TMPL = """%s
+
+Question: %s
+Expected answer: %s
+User's answer: %s
+
+Evaluate the user's answer on a scale of 1-5 and provide constructive feedback.
+Consider:
+1. Accuracy compared to document content
+2. Completeness of the response
+3. Understanding demonstrated
+
+Format your response as:
+Score: [1-5]
+Feedback: [Your detailed feedback]
+Justification: [Reference to specific document content]
+"""
+
+_SERVICE_TIERS = {"flex", "standard", "priority"}
+
+def _checked_service_tier(setting_name: str) -> Optional[str]:
+    """Return a service tier setting if it can be honoured; warn and ignore it otherwise."""
+    tier = getattr(settings, setting_name)
+    if not tier:
+        return None
+    if not GENAI_SDK_AVAILABLE:
+        print(f"Ignoring {setting_name}: service tiers require the google-genai package")  # For debugging
+        return None
+    if tier.lower() not in _SERVICE_TIERS:
+        print(f"Ignoring {setting_name}={tier!r}: expected one of {', '.join(sorted(_SERVICE_TIERS))}")  # For debugging
+        return None
+    return tier.lower()
+
+_BATCH_DONE_STATES = {
+    "JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"
+}
+
+
+# Generic questions served when question generation fails
+FALLBACK_QUESTIONS: List[Dict[str, Any]] = [
+    {
+        "question": "What are the main topics discussed in this document?",
+        "expected_answer": "Based on the document content, identify key themes and subjects.",
+        "type": "comprehension"
+    },
+    {
+        "question": "What conclusions can be drawn from the information presented?",
+        "expected_answer": "Analyze the evidence and reasoning to identify logical conclusions.",
+        "type": "inference"
+    },
+    {
+        "question": "How do the different sections of this document relate to each other?",
+        "expected_answer": "Examine the structure and connections between different parts.",
+        "type": "analysis"
+    }
+]
+
+
+class _QuestionRequest(NamedTuple):
+    model: Any
+    prompt: str
+    cache_key: str
+    cached: Optional[List[Dict[str, Any]]]
+
+
+class _EvaluationRequest(NamedTuple):
+    model: Any
+    prompt: str
+    cache_key: str
+    context_key: Optional[str]
+    embedding: Optional[Sequence[float]]
+    cached: Optional[Dict[str, Union[int, str]]]
+
 
 class QuestionGenerator:
     """Generate and evaluate questions based on document content using Google's Gemini AI."""
@@ -24,180 +162,480 @@ class QuestionGenerator:
         if not settings.GEMINI_API_KEY:
             raise ValueError("Gemini API key not found. Please set GEMINI_API_KEY in your .env file")
         
-        # Configure and initialize with proper type handling
-        genai.configure(api_key=settings.GEMINI_API_KEY)  # type: ignore[attr-defined]
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)  # type: ignore[attr-defined]
+        # Keeps a key set through AIAssistant.update_api_key rather than resetting it
+        configure_genai()
         
         self.question_types = [
             "comprehension", "inference", "analysis", "evaluation"
         ]
+        self._genai_client: Any = None
+        # Keyed by `background`; tiered calls go through the google-genai client
+        self._service_tiers = {
+            False: _checked_service_tier("GEMINI_SERVICE_TIER_INTERACTIVE"),
+            True: _checked_service_tier("GEMINI_SERVICE_TIER_BATCH"),
+        }
+        self.cache = ResponseCache()
+        self.context_cache = document_context_cache
+    
+    @property
+    def model(self) -> Any:
+        # Looked up per call so a key change from any caller is picked up
+        return shared_model(settings.GEMINI_MODEL)
     
-    def generate_challenge_questions(self, document_text: str) -> List[Dict[str, Any]]:
+    def load_document(self, document_text: str):
+        """Context-cache a newly uploaded document if it is large enough."""
+        self.context_cache.load(document_text)
+    
+    def generate_challenge_questions(self, document_text: str, regenerate: bool = False) -> List[Dict[str, Any]]:
         """Generate 3 challenging questions based on document content."""
+        return list(self.stream_challenge_questions(document_text, regenerate))
+    
+    def stream_challenge_questions(self, document_text: str,
+                                   regenerate: bool = False) -> Generator[Dict[str, Any], None, bool]:
+        """Yield each challenge question as soon as its answer line has streamed in.
+        
+        With regenerate=True the cached set is skipped so a new set is generated (and
+        cached in its place). Returns True only if all 3 questions were generated; False
+        after an error or an incomplete response, when the questions yielded are partial
+        or the fallbacks.
+        """
+        questions: List[Dict[str, Any]] = []
         try:
-            prompt = self._create_question_prompt(document_text)
+            request = self._prepare_questions(document_text, regenerate)
+            if request.cached is not None:
+                yield from request.cached
+                return True
             
-            # Dictionary approach works better with current package versions
-            generation_config: Any = {
-                'max_output_tokens': 800,
-                'temperature': 0.5,
-            }
+            # A Q/A pair is complete once the line after its answer has started arriving
+            questions_text, scanned_to = "", 0
+            for text in self._stream_text(request.model, request.prompt, QUESTION_GENERATION_CONFIG):
+                questions_text += text
+                for match in _QA_RE.finditer(questions_text, scanned_to):
+                    if match.end() == len(questions_text) or len(questions) == 3:
+                        break
+                    scanned_to = match.end()
+                    question = {
+                        "question": match.group(1),
+                        "expected_answer": match.group(2),
+                        "type": self._question_type(len(questions))
+                    }
+                    questions.append(question)
+                    yield question
             
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config  # type: ignore[arg-type]
-            )
+            # The final answer may end the response without a trailing newline
+            for question in self._parse_questions(questions_text)[len(questions):]:
+                questions.append(question)
+                yield question
             
-            questions_text = response.text if response.text else ""
-            questions = self._parse_questions(questions_text)
-            return questions
+            if self._store_questions(request, questions):
+                return True
             
         except Exception as e:
             print(f"Error generating questions: {e}")  # For debugging
-            # Fallback questions if API fails
-            return self._generate_fallback_questions(document_text)
+        
+        # Fallback questions if API fails
+        if not questions:
+            yield from self._generate_fallback_questions(document_text)
+        return False
     
-    def evaluate_answer(self, question: str, user_answer: str, 
-                       document_text: str, correct_answer: str) -> Dict[str, Union[int, str]]:
-        """Evaluate user's answer and provide feedback."""
+    def evaluate_answer(self, question: str, user_answer: str, document_text: str,
+                        correct_answer: str, background: bool = False,
+                        embedding: Optional[Sequence[float]] = None) -> Dict[str, Union[int, str]]:
+        """Evaluate user's answer and provide feedback.
+        
+        Background (non-interactive) evaluations use the batch service tier, if configured.
+        A precomputed embedding of the answer may be passed in for the semantic cache tier.
+        """
         try:
-            prompt = f"""
-            Document excerpt: {document_text[:1000]}...
-            
-            Question: {question}
-            Expected answer: {correct_answer}
-            User's answer: {user_answer}
-            
-            Evaluate the user's answer on a scale of 1-5 and provide constructive feedback.
-            Consider:
-            1. Accuracy compared to document content
-            2. Completeness of the response
-            3. Understanding demonstrated
-            
-            Format your response as:
-            Score: [1-5]
-            Feedback: [Your detailed feedback]
-            Justification: [Reference to specific document content]
-            """
-            
-            generation_config: Any = {
-                'max_output_tokens': 400,
-                'temperature': 0.3,
-            }
-            
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config  # type: ignore[arg-type]
+            request = self._prepare_evaluation(question, user_answer, document_text, correct_answer, embedding)
+            if request.cached is not None:
+                return request.cached
+            return self._store_evaluation(
+                request, self._generate_text(request.model, request.prompt, EVALUATION_CONFIG, background)
             )
             
-            evaluation = response.text if response.text else ""
-            return self._parse_evaluation(evaluation)
+        except Exception as e:
+            print(f"Error evaluating answer: {e}")  # For debugging
+            return self._fallback_evaluation()
+    
+    def evaluate_answers(self, questions: List[Dict[str, Any]], user_answers: List[str],
+                         document_text: str) -> List[Dict[str, Union[int, str]]]:
+        """Evaluate several answers concurrently, returning evaluations in input order."""
+        if not questions:
+            return []
+        embeddings = self._embed_answers(questions, user_answers)
+        
+        # Each evaluation is a network round-trip, so overlap them on a small pool
+        with ThreadPoolExecutor(max_workers=min(settings.GEMINI_MAX_CONCURRENCY, len(questions))) as executor:
+            return list(executor.map(
+                lambda question_data, user_answer, embedding: self.evaluate_answer(
+                    question_data["question"], user_answer, document_text,
+                    question_data["expected_answer"], background=True, embedding=embedding
+                ),
+                questions, user_answers, embeddings
+            ))
+    
+    async def agenerate_challenge_questions(self, document_text: str,
+                                            regenerate: bool = False) -> List[Dict[str, Any]]:
+        """Async variant of generate_challenge_questions for callers with an event loop."""
+        questions: List[Dict[str, Any]] = []
+        try:
+            # Cache lookups hit SQLite, so keep them off the event loop
+            request = await asyncio.to_thread(self._prepare_questions, document_text, regenerate)
+            if request.cached is not None:
+                return request.cached
             
+            questions = self._parse_questions(
+                await self._agenerate_text(request.model, request.prompt, QUESTION_GENERATION_CONFIG)
+            )
+            self._store_questions(request, questions)
+        
+        except Exception as e:
+            print(f"Error generating questions: {e}")  # For debugging
+        
+        return questions or self._generate_fallback_questions(document_text)
+    
+    async def aevaluate_answer(self, question: str, user_answer: str, document_text: str,
+                               correct_answer: str, background: bool = False,
+                               embedding: Optional[Sequence[float]] = None) -> Dict[str, Union[int, str]]:
+        """Async variant of evaluate_answer for callers with an event loop."""
+        try:
+            # Cache lookups and embedding are blocking calls, so keep them off the event loop
+            request = await asyncio.to_thread(
+                self._prepare_evaluation, question, user_answer, document_text, correct_answer, embedding
+            )
+            if request.cached is not None:
+                return request.cached
+            return self._store_evaluation(
+                request, await self._agenerate_text(request.model, request.prompt, EVALUATION_CONFIG, background)
+            )
+        
         except Exception as e:
             print(f"Error evaluating answer: {e}")  # For debugging
-            return {
-                "score": 3,
-                "feedback": "Unable to evaluate answer at this time.",
-                "justification": "System error occurred during evaluation."
-            }
+            return self._fallback_evaluation()
     
-    def _create_question_prompt(self, document_text: str) -> str:
-        """Create prompt for question generation."""
-        text_excerpt = document_text[:2000]  # Limit for token efficiency
+    async def aevaluate_answers(self, questions: List[Dict[str, Any]], user_answers: List[str],
+                                document_text: str) -> List[Dict[str, Union[int, str]]]:
+        """Evaluate several answers with asyncio.gather, at most GEMINI_MAX_CONCURRENCY at a time."""
+        if not questions:
+            return []
+        embeddings = await asyncio.to_thread(self._embed_answers, questions, user_answers)
+        semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
         
-        return f"""
-        Based on the following document, generate exactly 3 challenging questions that test comprehension, inference, and analysis.
+        async def evaluate(question_data: Dict[str, Any], user_answer: str,
+                           embedding: Optional[Sequence[float]]) -> Dict[str, Union[int, str]]:
+            async with semaphore:
+                return await self.aevaluate_answer(
+                    question_data["question"], user_answer, document_text,
+                    question_data["expected_answer"], background=True, embedding=embedding
+                )
         
-        Document: {text_excerpt}
+        return list(await asyncio.gather(*(
+            evaluate(question_data, user_answer, embedding)
+            for question_data, user_answer, embedding in zip(questions, user_answers, embeddings)
+        )))
+    
+    # Shared by the sync and async paths: build the prompt and check the caches, then
+    # store a fresh result only if it is complete.
+    
+    def _prepare_questions(self, document_text: str, regenerate: bool = False) -> _QuestionRequest:
+        """Build the question prompt and look up a cached set unless regenerating."""
+        model, context_cached = self._model_for(document_text)
+        prompt = self._create_question_prompt(document_text, context_cached)
+        cache_key = self._cache_key(prompt, QUESTION_GENERATION_CONFIG, document_text)
+        cached = None if regenerate else self.cache.get(cache_key)
+        return _QuestionRequest(model, prompt, cache_key, cached)
+    
+    def _store_questions(self, request: _QuestionRequest, questions: List[Dict[str, Any]]) -> bool:
+        """Cache a complete set of 3 questions; return whether the set was complete."""
+        if len(questions) != 3:
+            return False
+        self.cache.set(request.cache_key, questions)
+        return True
+    
+    def _prepare_evaluation(self, question: str, user_answer: str, document_text: str, correct_answer: str,
+                            embedding: Optional[Sequence[float]] = None) -> _EvaluationRequest:
+        """Build the evaluation prompt and look the answer up in the exact and semantic cache tiers."""
+        model, context_cached = self._model_for(document_text)
+        prompt = self._create_evaluation_prompt(question, user_answer, document_text, correct_answer, context_cached)
+        cache_key = self._cache_key(prompt, EVALUATION_CONFIG, document_text)
+        cached = self.cache.get(cache_key)
+        if cached is not None or not settings.SEMANTIC_CACHE_ENABLED:
+            return _EvaluationRequest(model, prompt, cache_key, None, None, cached)
         
-        Create questions that:
-        1. Require understanding of key concepts
-        2. Test ability to make inferences
-        3. Analyze relationships between ideas
+        # Near-duplicate answers only match within the same document and question
+        context_key = self.cache.make_key(
+            document=content_hash(document_text), question=question, expected_answer=correct_answer
+        )
+        if embedding is None:
+            try:
+                embedding = self._embed(user_answer)
+            except Exception as e:
+                # The semantic tier is optional; grade without it
+                print(f"Error embedding answer: {e}")  # For debugging
+                return _EvaluationRequest(model, prompt, cache_key, None, None, None)
+        similar = self.cache.get_similar(context_key, embedding)
+        return _EvaluationRequest(model, prompt, cache_key, context_key, embedding, similar)
+    
+    def _store_evaluation(self, request: _EvaluationRequest, evaluation_text: str) -> Dict[str, Union[int, str]]:
+        """Parse an evaluation response and cache it if it was scored."""
+        evaluation, scored = self._scan_evaluation(evaluation_text)
+        # An unscored response is all defaults; don't pin it for this answer
+        if scored:
+            self.cache.set(request.cache_key, evaluation)
+            if request.embedding is not None:
+                self.cache.set_similar(request.context_key, request.embedding, evaluation)
+        return evaluation
+    
+    def _embed_answers(self, questions: List[Dict[str, Any]], user_answers: List[str]) -> List[Any]:
+        """Embed every answer in one request for the semantic tier, or return Nones if it is off or fails."""
+        embeddings: List[Any] = [None] * len(questions)
+        if settings.SEMANTIC_CACHE_ENABLED:
+            try:
+                embeddings = list(embed_batch(user_answers[:len(questions)]))
+            except Exception as e:
+                print(f"Error embedding answers: {e}")  # For debugging
+        return embeddings
+    
+    def submit_question_batch(self, documents: List[str]) -> str:
+        """Submit question generation for several documents as one Batch API job.
         
-        Format each question as:
-        Q1: [Question]
-        A1: [Expected answer based on document]
+        Batch jobs are billed at half price but may take hours, so this is meant for
+        pre-generating questions offline. Returns the job name for collect_question_batch.
+        """
+        batch_job = self._get_genai_client().batches.create(
+            model=settings.GEMINI_BATCH_MODEL,
+            src=[
+                {
+                    "contents": [{"parts": [{"text": self._create_question_prompt(document)}], "role": "user"}],
+                    "config": QUESTION_GENERATION_CONFIG
+                }
+                for document in documents
+            ],
+            config={"display_name": "challenge-questions"}
+        )
+        return batch_job.name
+    
+    def collect_question_batch(self, job_name: str) -> Optional[List[List[Dict[str, Any]]]]:
+        """Return questions per submitted document, or None while the job is still running."""
+        batch_job = self._get_genai_client().batches.get(name=job_name)
+        state = batch_job.state.name
+        if state not in _BATCH_DONE_STATES:
+            return None
+        if state != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"Batch job {job_name} finished with state {state}")
         
-        Q2: [Question]
-        A2: [Expected answer based on document]
+        results: List[List[Dict[str, Any]]] = []
+        for item in batch_job.dest.inlined_responses:
+            questions_text = item.response.text if item.response and item.response.text else ""
+            results.append(self._parse_questions(questions_text) or self._generate_fallback_questions(""))
+        return results
+    
+    def submit_evaluation_batch(self, questions: List[Dict[str, Any]], user_answers: List[str],
+                                document_text: str) -> str:
+        """Submit answer evaluations as a file-based Batch API job for offline grading.
         
-        Q3: [Question]
-        A3: [Expected answer based on document]
+        Returns the job name for collect_evaluation_batch, which also needs the number of
+        evaluations submitted: min(len(questions), len(user_answers)).
         """
+        client = self._get_genai_client()
+        
+        requests_file = tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8")
+        try:
+            with requests_file:
+                for i, (question_data, user_answer) in enumerate(zip(questions, user_answers)):
+                    prompt = self._create_evaluation_prompt(
+                        question_data["question"], user_answer, document_text, question_data["expected_answer"]
+                    )
+                    requests_file.write(json.dumps({
+                        "key": f"eval_{i}",
+                        "request": {
+                            "contents": [{"parts": [{"text": prompt}], "role": "user"}],
+                            "generation_config": EVALUATION_CONFIG
+                        }
+                    }) + "\n")
+            
+            uploaded = client.files.upload(
+                file=requests_file.name,
+                config={"display_name": "answer-evaluations", "mime_type": "jsonl"}
+            )
+        finally:
+            os.remove(requests_file.name)
+        
+        batch_job = client.batches.create(
+            model=settings.GEMINI_BATCH_MODEL,
+            src=uploaded.name,
+            config={"display_name": "answer-evaluations"}
+        )
+        return batch_job.name
+    
+    def collect_evaluation_batch(self, job_name: str,
+                                 num_submitted: int) -> Optional[List[Dict[str, Union[int, str]]]]:
+        """Return num_submitted evaluations in submission order, or None while the job is still running.
+        
+        Requests missing from the job output get the fallback evaluation.
+        """
+        client = self._get_genai_client()
+        batch_job = client.batches.get(name=job_name)
+        state = batch_job.state.name
+        if state not in _BATCH_DONE_STATES:
+            return None
+        if state != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"Batch job {job_name} finished with state {state}")
+        
+        evaluations: Dict[int, Dict[str, Union[int, str]]] = {}
+        results = client.files.download(file=batch_job.dest.file_name).decode("utf-8")
+        for line in results.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            index = int(result["key"].split("_", 1)[1])
+            try:
+                parts = result["response"]["candidates"][0]["content"]["parts"]
+                evaluations[index] = self._parse_evaluation("".join(part.get("text", "") for part in parts))
+            except (KeyError, IndexError):
+                evaluations[index] = self._fallback_evaluation()
+        
+        return [evaluations.get(i, self._fallback_evaluation()) for i in range(num_submitted)]
+    
+    def _get_genai_client(self) -> Any:
+        """Create the google-genai client used for Batch API jobs and tiered calls on first use."""
+        if not GENAI_SDK_AVAILABLE:
+            raise ImportError("google.genai package is not installed. Please install it with: pip install google-genai")
+        if self._genai_client is None:
+            self._genai_client = genai_sdk.Client(api_key=settings.GEMINI_API_KEY)  # type: ignore[union-attr]
+        return self._genai_client
+    
+    def _generate_text(self, model: Any, prompt: str, base_config: Dict[str, Any], background: bool = False) -> str:
+        """Run a request on model, through the google-genai client if a service tier applies."""
+        tier = self._service_tiers[background]
+        if tier:
+            response = self._get_genai_client().models.generate_content(
+                model=model.model_name, contents=prompt, config=self._tiered_config(model, base_config, tier)
+            )
+        else:
+            response = model.generate_content(prompt, generation_config=base_config)
+        return response.text or ""
+    
+    async def _agenerate_text(self, model: Any, prompt: str, base_config: Dict[str, Any],
+                              background: bool = False) -> str:
+        """Async variant of _generate_text."""
+        tier = self._service_tiers[background]
+        if tier:
+            response = await self._get_genai_client().aio.models.generate_content(
+                model=model.model_name, contents=prompt, config=self._tiered_config(model, base_config, tier)
+            )
+        else:
+            response = await model.generate_content_async(prompt, generation_config=base_config)
+        return response.text or ""
+    
+    def _stream_text(self, model: Any, prompt: str, base_config: Dict[str, Any]) -> Iterator[str]:
+        """Yield the text of an interactive streamed request as it arrives."""
+        tier = self._service_tiers[False]
+        if tier:
+            for chunk in self._get_genai_client().models.generate_content_stream(
+                model=model.model_name, contents=prompt, config=self._tiered_config(model, base_config, tier)
+            ):
+                if chunk.text:
+                    yield chunk.text
+        else:
+            for chunk in model.generate_content(prompt, generation_config=base_config, stream=True):
+                if chunk.parts:
+                    yield chunk.text
+    
+    def _tiered_config(self, model: Any, base_config: Dict[str, Any], tier: str) -> Dict[str, Any]:
+        """google-genai request config with the service tier and the model's cached context, if any."""
+        config = {**base_config, 'service_tier': tier}
+        cached_content = getattr(model, "cached_content", None)
+        if cached_content:
+            config['cached_content'] = cached_content
+        return config
+    
+    def _model_for(self, document_text: str) -> Tuple[Any, bool]:
+        """Return the model to use and whether it holds the document in cached context."""
+        cached_model = self.context_cache.model_for(document_text)
+        if cached_model is not None:
+            return cached_model, True
+        return self.model, False
+    
+    def _cache_key(self, prompt: str, generation_config: Dict[str, Any], document_text: str) -> str:
+        """Exact-match cache key for a request."""
+        # Prompts against cached context omit the document, so key on its hash too
+        return self.cache.make_key(
+            model=settings.GEMINI_MODEL, prompt=prompt, config=generation_config,
+            document=content_hash(document_text)
+        )
+    
+    def _embed(self, text: str) -> Sequence[float]:
+        """Embed text for the semantic cache tier."""
+        return embed_batch([text])[0]
+    
+    def _create_question_prompt(self, document_text: str, context_cached: bool = False) -> str:
+        """Create prompt for question generation."""
+        if context_cached:
+            return _QUESTION_TMPL % ("the document provided in context", "")
+        text_excerpt = truncate_to_tokens(document_text, settings.QUESTION_PROMPT_TOKENS)
+        return _QUESTION_TMPL % ("the following document", "Document: " + text_excerpt)
+    
+    def _create_evaluation_prompt(self, question: str, user_answer: str, document_text: str,
+                                  correct_answer: str, context_cached: bool = False) -> str:
+        """Create prompt for answer evaluation."""
+        if context_cached:
+            document_section = "Document: provided in context"
+        else:
+            document_section = "Document excerpt: %s..." % truncate_to_tokens(document_text, settings.EVALUATION_PROMPT_TOKENS)
+        return _EVAL_TMPL % (document_section, question, correct_answer, user_answer)
+    
+    def _question_type(self, index: int) -> str:
+        """Type of the question at this position; the prompt asks for them in question_types order."""
+        return self.question_types[min(index, len(self.question_types) - 1)]
     
     def _parse_questions(self, questions_text: str) -> List[Dict[str, Any]]:
         """Parse generated questions into structured format."""
-        questions: List[Dict[str, Any]] = []
-        lines = questions_text.strip().split('\n')
-        
-        current_q: Optional[str] = None
-        current_a: Optional[str] = None
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('Q') and ':' in line:
-                if current_q and current_a:
-                    questions.append({
-                        "question": current_q,
-                        "expected_answer": current_a,
-                        "type": random.choice(self.question_types)
-                    })
-                current_q = line.split(':', 1)[1].strip()
-                current_a = None
-            elif line.startswith('A') and ':' in line and current_q:
-                current_a = line.split(':', 1)[1].strip()
-        
-        # Add the last question if exists
-        if current_q and current_a:
-            questions.append({
-                "question": current_q,
-                "expected_answer": current_a,
-                "type": random.choice(self.question_types)
-            })
+        questions: List[Dict[str, Any]] = [
+            {
+                "question": question,
+                "expected_answer": answer,
+                "type": self._question_type(i)
+            }
+            for i, (question, answer) in enumerate(_QA_RE.findall(questions_text))
+        ]
         
         return questions[:3]  # Ensure only 3 questions
     
     def _parse_evaluation(self, evaluation_text: str) -> Dict[str, Union[int, str]]:
         """Parse evaluation response into structured format."""
+        return self._scan_evaluation(evaluation_text)[0]
+    
+    def _scan_evaluation(self, evaluation_text: str) -> Tuple[Dict[str, Union[int, str]], bool]:
+        """Parse an evaluation response and report whether it contained a Score line."""
         result: Dict[str, Union[int, str]] = {"score": 3, "feedback": "", "justification": ""}
         
-        for line in evaluation_text.split('\n'):
-            line = line.strip()
-            if line.startswith('Score:'):
-                try:
-                    score_text = line.split(':')[1].strip()
-                    # Handle cases like "Score: 4/5" or "Score: 4"
-                    score = int(score_text.split('/')[0])
-                    result["score"] = max(1, min(5, score))
-                except (ValueError, IndexError):
-                    pass
-            elif line.startswith('Feedback:'):
-                result["feedback"] = line.split(':', 1)[1].strip()
-            elif line.startswith('Justification:'):
-                result["justification"] = line.split(':', 1)[1].strip()
-        
-        return result
+        found = set()
+        for match in _EVAL_RE.finditer(evaluation_text):
+            field = match.lastgroup
+            if field in found:
+                continue
+            found.add(field)
+            value = match.group(field)
+            # Handles "Score: 4/5" as well as "Score: 4"
+            result[field] = max(1, min(5, int(value))) if field == "score" else value
+            if len(found) == 3:
+                break
+        
+        return result, "score" in found
+    
+    def _fallback_evaluation(self) -> Dict[str, Union[int, str]]:
+        """Neutral evaluation returned when the API call fails."""
+        return {
+            "score": 3,
+            "feedback": "Unable to evaluate answer at this time.",
+            "justification": "System error occurred during evaluation."
+        }
     
     def _generate_fallback_questions(self, document_text: str) -> List[Dict[str, Any]]:
         """Generate simple fallback questions if API fails."""
-        return [
-            {
-                "question": "What are the main topics discussed in this document?",
-                "expected_answer": "Based on the document content, identify key themes and subjects.",
-                "type": "comprehension"
-            },
-            {
-                "question": "What conclusions can be drawn from the information presented?",
-                "expected_answer": "Analyze the evidence and reasoning to identify logical conclusions.",
-                "type": "inference"
-            },
-            {
-                "question": "How do the different sections of this document relate to each other?",
-                "expected_answer": "Examine the structure and connections between different parts.",
-                "type": "analysis"
-            }
-        ]
+        return [dict(q) for q in FALLBACK_QUESTIONS]
     
     def validate_api_key(self) -> bool:
         """Validate if the Gemini API key is working."""
@@ -0,0 +1,29 @@
+"""
+Batched Gemini embeddings for the semantic response cache.
+"""
+from typing import Sequence
+import numpy as np
+from config.settings import settings
+
+try:
+    import google.generativeai as genai  # type: ignore[import]
+except ImportError:
+    genai = None
+
+EMBEDDING_DIMENSIONS = 768
+
+
+def embed_batch(texts: Sequence[str]) -> np.ndarray:
+    """Embed all texts in a single request and return a (len(texts), EMBEDDING_DIMENSIONS) float32 matrix."""
+    if not texts:
+        return np.empty((0, EMBEDDING_DIMENSIONS), dtype=np.float32)
+    if genai is None:
+        raise ImportError("google.generativeai package is not installed. Please install it with: pip install google-generativeai")
+
+    # A list of contents goes out as one batchEmbedContents call rather than N embedContent calls
+    result = genai.embed_content(  # type: ignore[attr-defined]
+        model=settings.EMBEDDING_MODEL,
+        content=list(texts),
+        output_dimensionality=EMBEDDING_DIMENSIONS
+    )
+    return np.asarray(result["embedding"], dtype=np.float32)
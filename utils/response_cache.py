@@ -0,0 +1,127 @@
+"""
+Two-tier cache for Gemini responses: exact prompt matches and similar answers.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+import numpy as np
+from config.settings import settings
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+
+class ResponseCache:
+    """Cache parsed Gemini responses in memory (LRU) and in a local SQLite file.
+
+    Exact lookups are keyed on a SHA-256 of the request payload. Semantic lookups
+    only compare embeddings stored under the same context key, so a near-duplicate
+    answer to a different question or document can never produce a hit.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 256):
+        self.path = path or settings.RESPONSE_CACHE_PATH
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._similar: "OrderedDict[str, List[Tuple[np.ndarray, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+        except (OSError, sqlite3.Error) as e:
+            # Fall back to memory-only caching on read-only or sandboxed filesystems
+            print(f"Response cache disk tier disabled: {e}")  # For debugging
+            self._db = None
+
+    @staticmethod
+    def make_key(**payload: Any) -> str:
+        """Build a stable cache key from the request parameters."""
+        if ORJSON_AVAILABLE:
+            serialized = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)  # type: ignore[union-attr]
+        else:
+            serialized = json.dumps(payload, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(serialized).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for an exact key, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                # e.g. "database is locked" when several app processes share the file
+                print(f"Response cache disk read failed: {e}")  # For debugging
+                return None
+            if row is None:
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value)
+            return value
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value under an exact key."""
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value) VALUES (?, ?)", (key, json.dumps(value))
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                # The value is still served from memory; only the disk copy is lost
+                print(f"Response cache disk write failed: {e}")  # For debugging
+
+    def get_similar(self, context_key: str, embedding: Sequence[float]) -> Optional[Any]:
+        """Return the value of the closest stored embedding in this context above the threshold."""
+        query = self._normalize(embedding)
+        with self._lock:
+            entries = self._similar.get(context_key)
+            if not entries:
+                return None
+            self._similar.move_to_end(context_key)
+            similarities = np.stack([vector for vector, _ in entries]) @ query
+            best = int(similarities.argmax())
+            if similarities[best] >= settings.SEMANTIC_CACHE_THRESHOLD:
+                return entries[best][1]
+            return None
+
+    def set_similar(self, context_key: str, embedding: Sequence[float], value: Any):
+        """Store a value under an embedding within the given context."""
+        with self._lock:
+            entries = self._similar.setdefault(context_key, [])
+            entries.append((self._normalize(embedding), value))
+            del entries[:-32]
+            self._similar.move_to_end(context_key)
+            while len(self._similar) > self.max_memory_entries:
+                self._similar.popitem(last=False)
+
+    def _remember(self, key: str, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -1,41 +1,77 @@
+import bisect
+import hashlib
+import heapq
 import re
-from typing import List
+from typing import Iterator, List
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)]')
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+_WORD_RE = re.compile(r'\S+')
+
+# ASCII characters _SPECIAL_CHARS_RE would remove, as a str.translate table
+_SPECIAL_CHARS_TABLE = {code: None for code in range(128) if _SPECIAL_CHARS_RE.match(chr(code))}
+
+# Rough average for English text under Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Lowercase keywords that mark a sentence as likely summary material
+_IMPORTANT_WORDS = ('conclusion', 'result', 'finding', 'important', 'significant', 'main', 'key')
 
 def clean_text(text: str) -> str:
     """Clean and normalize text content."""
     # Remove extra whitespace and normalize
-    text = re.sub(r'\s+', ' ', text.strip())
+    text = _WHITESPACE_RE.sub(' ', text.strip())
     # Remove special characters that might cause issues
-    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)]', '', text)
+    # translate is a single pass for ASCII text; \w and \s need the regex beyond ASCII
+    if text.isascii():
+        text = text.translate(_SPECIAL_CHARS_TABLE)
+    else:
+        text = _SPECIAL_CHARS_RE.sub('', text)
     return text
 
-def chunk_text(text: str, max_chunk_size: int = 2000, overlap: int = 200) -> List[str]:
-    """Split text into overlapping chunks for better processing."""
-    words = text.split()
-    chunks = []
+def chunk_text(text: str, max_chunk_size: int = 2000, overlap: int = 200) -> Iterator[str]:
+    """Yield overlapping chunks of up to max_chunk_size characters, split on word boundaries."""
+    words = [match.span() for match in _WORD_RE.finditer(text)]
+    starts = [start for start, _ in words]
+    ends = [end for _, end in words]
     
-    for i in range(0, len(words), max_chunk_size - overlap):
-        chunk = ' '.join(words[i:i + max_chunk_size])
-        chunks.append(chunk)
+    i = 0
+    while i < len(words):
+        # Take every word that ends within the window; an overlong word forms its own chunk
+        j = bisect.bisect_right(ends, starts[i] + max_chunk_size, lo=i + 1)
+        yield text[starts[i]:ends[j - 1]]
         
-        if i + max_chunk_size >= len(words):
+        if j >= len(words):
             break
+        # Start the next chunk at the first word within `overlap` characters of this chunk's end
+        i = bisect.bisect_left(starts, ends[j - 1] - overlap, lo=i + 1, hi=j)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Return the longest prefix of text that fits in about max_tokens, cut on a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
     
-    return chunks
+    cut = max(text.rfind(' ', 0, max_chars + 1), text.rfind('\n', 0, max_chars + 1))
+    return text[:cut if cut > 0 else max_chars].rstrip()
 
 def extract_key_sentences(text: str, num_sentences: int = 5) -> List[str]:
     """Extract key sentences for summary generation."""
-    sentences = re.split(r'[.!?]+', text)
+    sentences = _SENTENCE_SPLIT_RE.split(text)
     sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
     
     # Simple heuristic: prefer sentences with common important words
-    important_words = ['conclusion', 'result', 'finding', 'important', 'significant', 'main', 'key']
-    
     scored_sentences = []
     for sentence in sentences:
-        score = sum(1 for word in important_words if word.lower() in sentence.lower())
+        sentence_lower = sentence.lower()
+        score = sum(1 for word in _IMPORTANT_WORDS if word in sentence_lower)
         scored_sentences.append((score, sentence))
     
-    # Sort by score and length, return top sentences
-    scored_sentences.sort(key=lambda x: (x[0], len(x[1])), reverse=True)
-    return [sent[1] for sent in scored_sentences[:num_sentences]]
\ No newline at end of file
+    # Select the top sentences by score and length without sorting the whole list
+    top_sentences = heapq.nlargest(num_sentences, scored_sentences, key=lambda x: (x[0], len(x[1])))
+    return [sent[1] for sent in top_sentences]
+
+def content_hash(text: str) -> str:
+    """Return a short, stable hash of text content for use as a cache key."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
@@ -2,14 +2,17 @@ import os
 from typing import Optional
 from config.settings import settings
 
+def get_file_extension(file_name: str) -> str:
+    """Return the lowercased extension of a file name, e.g. ".pdf"; a dotfile like ".pdf" has none."""
+    return os.path.splitext(file_name)[1].lower()
+
 def validate_file(file) -> tuple[bool, Optional[str]]:
     """Validate uploaded file format and size."""
     if file is None:
         return False, "No file uploaded"
     
-    file_extension = os.path.splitext(file.name)[1].lower()
-    if file_extension not in settings.SUPPORTED_FORMATS:
-        return False, f"Unsupported format. Please upload {', '.join(settings.SUPPORTED_FORMATS)} files"
+    if get_file_extension(file.name) not in settings.SUPPORTED_FORMATS:
+        return False, f"Unsupported format. Please upload {settings.SUPPORTED_FORMATS_DISPLAY} files"
     
     if file.size > settings.MAX_FILE_SIZE:
         return False, f"File too large. Maximum size: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
@@ -18,10 +21,11 @@ def validate_file(file) -> tuple[bool, Optional[str]]:
 
 def validate_question(question: str) -> tuple[bool, Optional[str]]:
     """Validate user question input."""
-    if not question or not question.strip():
+    stripped = (question or "").strip()
+    if not stripped:
         return False, "Please enter a question"
     
-    if len(question.strip()) < 5:
+    if len(stripped) < 5:
         return False, "Question too short. Please be more specific"
     
     if len(question) > 500:
@@ -29,22 +33,42 @@ def validate_question(question: str) -> tuple[bool, Optional[str]]:
     
     return True, None
 
+def validate_answer(answer: str) -> tuple[bool, Optional[str]]:
+    """Check that a challenge answer is substantial enough to be worth grading."""
+    if not answer or len(answer.strip()) < 10:
+        return False, "Answer too short. Please explain your reasoning in a full sentence"
+    
+    if len(set(answer.lower().split())) < 3:
+        return False, "Answer too short. Please use at least a few distinct words"
+    
+    return True, None
+
 def validate_text_content(text: str) -> tuple[bool, Optional[str]]:
     """Validate extracted text content."""
-    if not text or not text.strip():
+    stripped = (text or "").strip()
+    if not stripped:
         return False, "No readable content found in the document"
     
-    if len(text.strip()) < 50:
+    if len(stripped) < 50:
         return False, "Document content too short for meaningful analysis"
     
     return True, None
 
 def validate_api_key(api_key: str) -> tuple[bool, Optional[str]]:
     """Validate API key format."""
-    if not api_key or not api_key.strip():
+    stripped = (api_key or "").strip()
+    if not stripped:
         return False, "API key is required"
     
-    if len(api_key.strip()) < 10:
+    if len(stripped) < 10:
         return False, "API key appears to be invalid (too short)"
     
-    return True, None
\ No newline at end of file
+    return True, None
+
+def validate_files(files) -> list[tuple[bool, Optional[str]]]:
+    """Validate several uploaded files, returning results in input order."""
+    return [validate_file(file) for file in files]
+
+def validate_text_contents(texts) -> list[tuple[bool, Optional[str]]]:
+    """Validate several extracted texts, returning results in input order."""
+    return [validate_text_content(text) for text in texts]